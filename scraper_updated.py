@@ -1,8 +1,12 @@
 # scraper.py — Playwright scraper with fast selectors, pagination, VDP enrichment, year filtering
-import re, json, asyncio, argparse, random, socket
+import re, os, sys, json, asyncio, argparse, functools, logging
 from typing import List, Dict, Any, Optional
 from urllib.parse import urlencode, urljoin, urlsplit, urlunsplit
 from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+try: from selectolax.lexbor import LexborHTMLParser
+except ImportError: LexborHTMLParser = None
+try: import orjson
+except ImportError: orjson = None
 
 # -------------------- Config --------------------
 DEFAULT_ZIP = "10001"
@@ -11,19 +15,61 @@ NAV_TIMEOUT = 30000         # ms for page.goto
 SEL_TIMEOUT = 6000          # ms default for Playwright context selectors
 TEXT_TIMEOUT = 700          # ms tiny timeout per field read (prevents "hang")
 SCROLL_STEPS = 6
+VDP_CONCURRENCY = 6         # max VDP pages open at once per site
+BLOCKED_RESOURCES = {"image", "media", "font", "stylesheet"}
+BLOCKED_HOSTS = ("doubleclick", "googletagmanager", "adservice", "scorecardresearch")
+
+BROWSER_ARGS = ["--disable-blink-features=AutomationControlled","--no-sandbox","--disable-dev-shm-usage"]
+CONTEXT_OPTS = dict(
+    user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"),
+    viewport={"width":1280,"height":900}, locale="en-US",
+)
+
+# per-site card field selectors, tried in order (see _dump_cards)
+AT_CARD_FIELDS = {
+    "title": ["[data-cmp='subheading']", "[data-cmp='heading']"],
+    "href":  ["a"],
+    "price": ["[data-cmp='price']", ".first-price", ".price"],
+    "miles": ["[data-cmp='mileage']", ".mileage", ".item-card-specifications"],
+}
+CARS_CARD_FIELDS = {
+    "title": ["h2.title", "h2.vehicle-card-title"],
+    "href":  ["a.vehicle-card-link", "a"],
+    "price": ["[data-test='vehicleCardPriceAmount']", ".primary-price"],
+    "miles": ["[data-test='vehicleMileage']", ".mileage", ".vehicle-mileage"],
+}
+
+AT_CARDS_SEL = "[data-cmp='inventoryListing'], div.inventory-listing"
+CARS_CARDS_SEL = "div.vehicle-card, article.vehicle-card"
+
+# VDP (price, miles) selectors keyed by host substring; DEFAULT_VDP_SELECTORS for anything else
+VDP_SELECTORS = {
+    "cars.com": ("[data-test='vdp-price'], .vehicle-info__price-display, .primary-price",
+                 "[data-test='mileage'], .mileage, .vehicle-mileage"),
+    "autotrader.com": ("[data-cmp='stylePrice'], [data-cmp='firstPrice'], [data-cmp='price']",
+                       "[data-cmp='odometer'], [data-cmp='mileage']"),
+}
+DEFAULT_VDP_SELECTORS = ("h1, h2, .price, [class*='price']", ".mileage, [class*='mileage']")
 
 # -------------------- Utils --------------------
-def _print_progress(msg: str):
-    print(msg, flush=True)
+log = logging.getLogger("scraper")
 
-def _dns_ok(host: str, timeout=3) -> bool:
+async def _dns_ok(host: str, timeout=2) -> bool:
     try:
-        socket.setdefaulttimeout(timeout)
-        socket.gethostbyname(host)
+        await asyncio.wait_for(asyncio.get_running_loop().getaddrinfo(host, 443), timeout=timeout)
         return True
     except Exception:
         return False
 
+def _jloads(s: str):
+    # orjson is faster but rejects NaN/Infinity, which json.loads accepts: retry those with json.loads.
+    # orjson silently returns integers wider than 64 bits as floats; listing fields never get that big.
+    if orjson is not None:
+        try: return orjson.loads(s)
+        except orjson.JSONDecodeError: pass
+    return json.loads(s)
+
 def _to_int(s):
     if s is None: return None
     try: return int(str(s).replace(",", "").strip())
@@ -32,69 +78,121 @@ def _to_int(s):
 _price_re = re.compile(r"\$[\s]*([\d,]+)")
 _miles_re = re.compile(r"([\d,]+)\s*miles?", re.I)
 _year_re  = re.compile(r"\b(19|20)\d{2}\b")
+_price_miles_re = re.compile(r"\$\s*(?P<price>[\d,]+)|(?P<miles>[\d,]+)\s*miles?", re.I)
+_NBSP_TBL = str.maketrans({"\xa0": " "})
 
 def parse_price(text: Optional[str]):
-    if not text: return None
-    m = _price_re.search(text.replace("\xa0", " "))
+    if not text or "$" not in text: return None  # no regex call for the common negative case
+    if "\xa0" in text: text = text.translate(_NBSP_TBL)
+    m = _price_re.search(text)
     return _to_int(m.group(1)) if m else None
 
 def parse_miles(text: Optional[str]):
-    if not text: return None
-    m = _miles_re.search(text.replace("\xa0", " "))
+    if not text or "mi" not in text.lower(): return None
+    if "\xa0" in text: text = text.translate(_NBSP_TBL)
+    m = _miles_re.search(text)
     return _to_int(m.group(1)) if m else None
 
+def parse_price_miles(text: Optional[str]):
+    """(price, miles) from a single regex pass; stops as soon as both are found."""
+    price = miles = None
+    if not text: return price, miles
+    if "\xa0" in text: text = text.translate(_NBSP_TBL)
+    for m in _price_miles_re.finditer(text):
+        if m.lastgroup == "price":
+            if price is None: price = _to_int(m.group("price"))
+        elif miles is None: miles = _to_int(m.group("miles"))
+        if price is not None and miles is not None: break
+    return price, miles
+
 def parse_year_from_text(text: Optional[str]) -> Optional[int]:
     if not text: return None
     m = _year_re.search(text)
     return int(m.group(0)) if m else None
 
+# scroll loop runs in-page so the whole sequence is one CDP message instead of 2 per step
+_SCROLL_JS = """async ([steps, delay]) => {
+    for (let i = 0; i < steps; i++) {
+        window.scrollBy(0, 1600);
+        await new Promise(r => setTimeout(r, delay + Math.floor(Math.random() * 150)));
+    }
+}"""
+
 async def _scroll(page, steps=SCROLL_STEPS, delay=400):
-    for _ in range(steps):
-        await page.mouse.wheel(0, 1600)
-        await page.wait_for_timeout(delay + int(random.random() * 150))
+    # best-effort: a navigation/redirect mid-scroll destroys the JS context, which must not kill the scrape
+    try: await page.evaluate(_SCROLL_JS, [steps, delay])
+    except Exception as e: log.info("[SCROLL] Scroll interrupted: %s", e)
+
+# Walks every card in-page and returns [{title, href, price, miles}] in a single CDP round-trip.
+# Each field takes the first selector whose element has non-empty text (href: non-empty attribute).
+_CARDS_JS = """({cards, fields}) => Array.from(document.querySelectorAll(cards)).map(c => {
+    const first = (sels, attr) => {
+        for (const s of sels) {
+            const el = c.querySelector(s);
+            const v = el && (attr ? el.getAttribute(attr) : el.textContent);
+            if (v && v.trim()) return attr ? v : v.trim();
+        }
+        return null;
+    };
+    return {title: first(fields.title), href: first(fields.href, "href"),
+            price: first(fields.price), miles: first(fields.miles)};
+})"""
 
-async def _first_text(node, selectors, timeout=TEXT_TIMEOUT) -> Optional[str]:
-    """Return first available textContent among selectors without waiting long."""
-    for sel in selectors:
-        try:
-            t = await node.locator(sel).first.text_content(timeout=timeout)
-            if t:
-                return t.strip()
-        except Exception:
-            pass
-    return None
-
-async def _first_attr(node, selectors, attr, timeout=TEXT_TIMEOUT) -> Optional[str]:
-    for sel in selectors:
-        try:
-            v = await node.locator(sel).first.get_attribute(attr, timeout=timeout)
-            if v:
-                return v
-        except Exception:
-            pass
-    return None
+async def _dump_cards(page, cards_sel: str, fields: Dict[str, List[str]]) -> List[Dict[str, Optional[str]]]:
+    """Return raw card fields for every card matching cards_sel via one page.evaluate."""
+    return await page.evaluate(_CARDS_JS, {"cards": cards_sel, "fields": fields})
+
+_JSON_SCRIPTS = 'script#__NEXT_DATA__, script[type="application/ld+json"], script[type="application/json"]'
 
 def _json_candidates_from_html(html: str) -> List[dict]:
+    out=[]
+    if LexborHTMLParser is None: return _json_candidates_regex(html)
+    seen=set()
+    for s in LexborHTMLParser(html).css(_JSON_SCRIPTS):
+        # <script id="__NEXT_DATA__" type="application/json"> matches two selectors; parse it once
+        if s.mem_id in seen: continue
+        seen.add(s.mem_id)
+        try: out.append(_jloads(s.text()))
+        except Exception: pass
+    return out
+
+def _json_candidates_regex(html: str) -> List[dict]:
+    # fallback when selectolax isn't installed
     out=[]
     for m in re.finditer(r'__NEXT_DATA__\s*=\s*({.*?})\s*[,;]<', html, re.S):
-        try: out.append(json.loads(m.group(1)))
+        try: out.append(_jloads(m.group(1)))
         except Exception: pass
     for m in re.finditer(r'type=["\']application/(?:json|ld\+json)["\']>\s*(\{.*?\}|\[.*?\])\s*</script>', html, re.S):
-        try: out.append(json.loads(m.group(1)))
+        try: out.append(_jloads(m.group(1)))
         except Exception: pass
     return out
 
+_LISTING_KEY_NAMES = ("price","listPrice","primaryPrice","mileage","miles","year","make","model","title","heading","vdpUrl","url","vin")
+_LISTING_KEYS = frozenset(k.lower() for k in _LISTING_KEY_NAMES)
+_LISTING_KEYS_EXACT = _LISTING_KEYS | frozenset(_LISTING_KEY_NAMES)  # as spelled + lowercased, for isdisjoint
+
 def _walk_find_listings(obj: Any) -> List[Dict[str, Any]]:
-    KEYS={"price","listPrice","primaryPrice","mileage","miles","year","make","model","title","heading","vdpUrl","url","vin"}
     out=[]
-    def looks(d): return len({k.lower() for k in d.keys()} & {k.lower() for k in KEYS})>=3
-    def rec(x):
+    def looks(d):
+        if len(d) < 3: return False
+        # most dicts share no key with a listing: reject them without lowercasing anything
+        if _LISTING_KEYS_EXACT.isdisjoint(d): return False
+        c = 0
+        for k in d:
+            if k.lower() in _LISTING_KEYS:
+                c += 1
+                if c >= 3: return True
+        return False
+    # iterative pre-order walk (same order as recursion, no frame per node / recursion limit)
+    stack=[obj]
+    while stack:
+        x = stack.pop()
         if isinstance(x, dict):
             if looks(x): out.append(x)
-            for v in x.values(): rec(v)
+            stack.extend(reversed(list(x.values())))
         elif isinstance(x, list):
-            for v in x: rec(v)
-    rec(obj); return out
+            stack.extend(reversed(x))
+    return out
 
 def _abs(base: str, h: Optional[str]) -> Optional[str]:
     if not h: return None
@@ -105,36 +203,46 @@ def _abs(base: str, h: Optional[str]) -> Optional[str]:
     if h.startswith("/"):   return urljoin(base, h)
     return urljoin(base, "/" + h)
 
+@functools.lru_cache(maxsize=4096)
 def _normalize_url(u: Optional[str]) -> Optional[str]:
     if not u: return u
+    if "?" not in u and "#" not in u: return u  # nothing to strip; skip urlsplit
     parts = list(urlsplit(u)); parts[3]=parts[4]=""
     return urlunsplit(parts)
 
+@functools.lru_cache(maxsize=4096)
+def _dedupe_key(u: str):
+    """Comparison key only (display URL is kept): ignores scheme, leading www., and trailing slash."""
+    p = urlsplit(u)
+    return (p.netloc.lower().removeprefix("www."), p.path.rstrip("/"))
+
 def _dedupe_and_trim(rows: List[Dict[str,Any]], k:int) -> List[Dict[str,Any]]:
     uniq, seen=[], set()
     for r in rows:
         u=_normalize_url(r.get("url"))
         if not u: continue
-        if u in seen: continue
-        seen.add(u); r["url"]=u; uniq.append(r)
+        key=_dedupe_key(u)
+        if key in seen: continue
+        seen.add(key); r["url"]=u; uniq.append(r)
         if len(uniq)>=k: break
     return uniq
 
 def _enforce_year(rows: List[Dict[str,Any]], target_year: int) -> List[Dict[str,Any]]:
     filtered = [r for r in rows if r.get("year") == target_year]
     if not filtered:
-        _print_progress(f"[FILTER] No exact year {target_year} results. Increase --radius or try another ZIP/year.")
+        log.info("[FILTER] No exact year %s results. Increase --radius or try another ZIP/year.", target_year)
     return filtered
 
 # -------------------- Coercion --------------------
 def _coerce_listing(d: Dict[str,Any], source: str, base: str) -> Dict[str,Any]:
-    title = d.get("title") or d.get("heading")
-    price = d.get("price") or d.get("listPrice") or d.get("primaryPrice")
-    miles = d.get("miles") or d.get("mileage")
-    url = d.get("url") or d.get("vdpUrl") or d.get("link")
-    dealer = d.get("dealerName") or d.get("sellerName") or d.get("storeName")
-    loc = d.get("location") or d.get("city")
-    year_val = d.get("year")
+    g = d.get  # bound once; this runs for every candidate dict in large JSON payloads
+    title = g("title") or g("heading")
+    price = g("price") or g("listPrice") or g("primaryPrice")
+    miles = g("miles") or g("mileage")
+    url = g("url") or g("vdpUrl") or g("link")
+    dealer = g("dealerName") or g("sellerName") or g("storeName")
+    loc = g("location") or g("city")
+    year_val = g("year")
     if isinstance(year_val, str): year_val = _to_int(year_val)
     if not year_val: year_val = parse_year_from_text(title)
     if isinstance(price,str): price = parse_price(price) or _to_int(price)
@@ -145,12 +253,13 @@ def _coerce_listing(d: Dict[str,Any], source: str, base: str) -> Dict[str,Any]:
             "location":loc,"dealer":dealer,"url":url}
 
 # -------------------- Site scrapers --------------------
-async def _autotrader_deep_scroll(page, selector: str, max_rounds: int):
+async def _autotrader_deep_scroll(page, selector: str, max_rounds: int, target: Optional[int] = None):
     last_n, stable = -1, 0
     while stable < max_rounds:
         await _scroll(page, steps=1, delay=500)
         try: n = await page.locator(selector).count()
         except Exception: n = 0
+        if target and n >= target: return  # enough cards for the caller already loaded
         if n == last_n: stable += 1
         else: stable, last_n = 0, n
 
@@ -164,36 +273,32 @@ async def scrape_autotrader(page, make, model, year, zip_code, radius, max_resul
         "startYear": year, "endYear": year, "marketExtension":"include", "isNewSearch":"true",
     }
     url = "https://www.autotrader.com/cars-for-sale/all-cars?" + urlencode(params)
-    _print_progress(f"[AT] Navigating: {url}")
+    log.info("[AT] Navigating: %s", url)
     try: await page.goto(url, wait_until="domcontentloaded", timeout=NAV_TIMEOUT)
-    except PWTimeout: _print_progress("[AT] Navigation timed out; continuing.")
+    except PWTimeout: log.info("[AT] Navigation timed out; continuing.")
     # infinite-scroll pagination
-    cards_sel = "[data-cmp='inventoryListing'], div.inventory-listing"
-    await _autotrader_deep_scroll(page, cards_sel, max_rounds=scroll_rounds)
+    cards_sel = AT_CARDS_SEL
+    await _autotrader_deep_scroll(page, cards_sel, max_rounds=scroll_rounds, target=max_results*5)
 
     rows=[]
     try:
-        cards = page.locator(cards_sel)
-        n = await cards.count()
-        _print_progress(f"[AT] Cards after deep scroll: {n}")
-        for i in range(min(n, max_results*5)):
-            c = cards.nth(i)
-            title   = await _first_text(c, ["[data-cmp='subheading']", "[data-cmp='heading']"])
-            link    = await _first_attr(c, ["a"], "href")
-            link    = _abs("https://www.autotrader.com", link) if link else None
-            price_t = await _first_text(c, ["[data-cmp='price']", ".first-price", ".price"])
-            miles_t = await _first_text(c, ["[data-cmp='mileage']", ".mileage", ".item-card-specifications"])
+        data = await _dump_cards(page, cards_sel, AT_CARD_FIELDS)
+        n = len(data)
+        log.info("[AT] Cards after deep scroll: %s", n)
+        for i, c in enumerate(data[:max_results*5]):
+            title   = c["title"]
+            link    = _abs("https://www.autotrader.com", c["href"]) if c["href"] else None
             year_v  = parse_year_from_text(title)
             rows.append({"source":"Autotrader","title":title,
-                         "price":parse_price(price_t or ""), "miles":parse_miles(miles_t or ""),
+                         "price":parse_price(c["price"] or ""), "miles":parse_miles(c["miles"] or ""),
                          "year":year_v, "location":None,"dealer":None,"url":link})
-            if (i+1) % 10 == 0: _print_progress(f"[AT] Processed {i+1}/{n} cards…")
+            if (i+1) % 10 == 0: log.info("[AT] Processed %s/%s cards…", i+1, n)
             if len(rows)>=max_results: break
     except Exception as e:
-        _print_progress(f"[AT] DOM scrape error: {e}")
+        log.info("[AT] DOM scrape error: %s", e)
 
     if len(rows) < max_results:
-        _print_progress("[AT] Falling back to embedded JSON")
+        log.info("[AT] Falling back to embedded JSON")
         html = await page.content()
         for obj in _json_candidates_from_html(html):
             for c in _walk_find_listings(obj):
@@ -203,7 +308,7 @@ async def scrape_autotrader(page, make, model, year, zip_code, radius, max_resul
 
     rows = _enforce_year(rows, year)
     rows = _dedupe_and_trim(rows, max_results)
-    _print_progress(f"[AT] Returning {len(rows)} rows")
+    log.info("[AT] Returning %s rows", len(rows))
     return rows
 
 async def scrape_cars(page, make, model, year, zip_code, radius, max_results,
@@ -212,7 +317,7 @@ async def scrape_cars(page, make, model, year, zip_code, radius, max_results,
     model_q = model.lower().replace(" ", "_")
     base = "https://www.cars.com"
     rows: List[Dict[str, Any]] = []
-    seen_urls = set()
+    seen_urls = set()  # _dedupe_key(url)
 
     for page_no in range(1, max_pages + 1):
         params = {
@@ -228,52 +333,52 @@ async def scrape_cars(page, make, model, year, zip_code, radius, max_results,
             "page_size": 20,
         }
         url = f"{base}/shopping/results/?" + urlencode(params, doseq=True)
-        _print_progress(f"[CARS] Navigating page {page_no}: {url}")
+        log.info("[CARS] Navigating page %s: %s", page_no, url)
         try: await page.goto(url, wait_until="domcontentloaded", timeout=NAV_TIMEOUT)
-        except PWTimeout: _print_progress(f"[CARS] Nav timeout on page {page_no}; continuing.")
+        except PWTimeout: log.info("[CARS] Nav timeout on page %s; continuing.", page_no)
         await _scroll(page, 4)
 
         try:
-            cards = page.locator("div.vehicle-card, article.vehicle-card")
-            n = await cards.count()
-            _print_progress(f"[CARS] Page {page_no} DOM cards: {n}")
+            data = await _dump_cards(page, CARS_CARDS_SEL, CARS_CARD_FIELDS)
+            n = len(data)
+            log.info("[CARS] Page %s DOM cards: %s", page_no, n)
             if n == 0 and page_no > 1: break
-            for i in range(n):
-                c = cards.nth(i)
-                title   = await _first_text(c, ["h2.title", "h2.vehicle-card-title"])
-                href    = await _first_attr(c, ["a.vehicle-card-link","a"], "href")
-                href    = _abs(base, href) if href else None
-                price_t = await _first_text(c, ["[data-test='vehicleCardPriceAmount']", ".primary-price"])
-                miles_t = await _first_text(c, ["[data-test='vehicleMileage']", ".mileage", ".vehicle-mileage"])
+            for i, c in enumerate(data):
+                title   = c["title"]
+                href    = _abs(base, c["href"]) if c["href"] else None
+                price_t, miles_t = c["price"], c["miles"]
                 year_v  = parse_year_from_text(title)
                 norm    = _normalize_url(href)
-                if not norm or norm in seen_urls: continue
-                seen_urls.add(norm)
+                if not norm: continue
+                key     = _dedupe_key(norm)
+                if key in seen_urls: continue
+                seen_urls.add(key)
                 rows.append({"source":"Cars.com","title":title,
                              "price":parse_price(price_t or ""), "miles":parse_miles(miles_t or ""),
                              "year":year_v, "location":None,"dealer":None,"url":norm})
-                if (i+1) % 10 == 0: _print_progress(f"[CARS] Page {page_no}: processed {i+1}/{n}")
+                if (i+1) % 10 == 0: log.info("[CARS] Page %s: processed %s/%s", page_no, i+1, n)
                 if len(rows)>=max_results: break
             if len(rows)>=max_results: break
         except Exception as e:
-            _print_progress(f"[CARS] DOM scrape error on page {page_no}: {e}")
+            log.info("[CARS] DOM scrape error on page %s: %s", page_no, e)
 
         if len(rows) == 0:
-            _print_progress(f"[CARS] Page {page_no} falling back to embedded JSON")
+            log.info("[CARS] Page %s falling back to embedded JSON", page_no)
             html = await page.content()
             for obj in _json_candidates_from_html(html):
                 for c in _walk_find_listings(obj):
                     r = _coerce_listing(c, "Cars.com", base)
                     if not r.get("url"): continue
                     norm = _normalize_url(r["url"])
-                    if norm in seen_urls: continue
-                    seen_urls.add(norm); rows.append(r)
+                    key = _dedupe_key(norm)
+                    if key in seen_urls: continue
+                    seen_urls.add(key); rows.append(r)
                     if len(rows)>=max_results: break
                 if len(rows)>=max_results: break
 
     rows = _enforce_year(rows, year)
     rows = _dedupe_and_trim(rows, max_results)
-    _print_progress(f"[CARS] Returning {len(rows)} rows")
+    log.info("[CARS] Returning %s rows", len(rows))
     return rows
 
 # -------------------- VDP enrichment --------------------
@@ -282,23 +387,16 @@ async def enrich_vdp(context, row: Dict[str, Any]) -> Dict[str, Any]:
     if not url: return row
     page = await context.new_page()
     try:
-        _print_progress(f"[VDP] Visiting: {url}")
+        log.info("[VDP] Visiting: %s", url)
         try: await page.goto(url, wait_until="domcontentloaded", timeout=NAV_TIMEOUT)
-        except PWTimeout: _print_progress("[VDP] Navigation timeout; continuing.")
+        except PWTimeout: log.info("[VDP] Navigation timeout; continuing.")
         await _scroll(page, steps=2, delay=250)
         html = await page.content()
 
         price = row.get("price"); miles = row.get("miles"); title = row.get("title"); year_v = row.get("year")
 
-        if "cars.com" in url:
-            sels_price = "[data-test='vdp-price'], .vehicle-info__price-display, .primary-price"
-            sels_miles = "[data-test='mileage'], .mileage, .vehicle-mileage"
-        elif "autotrader.com" in url:
-            sels_price = "[data-cmp='stylePrice'], [data-cmp='firstPrice'], [data-cmp='price']"
-            sels_miles = "[data-cmp='odometer'], [data-cmp='mileage']"
-        else:
-            sels_price = "h1, h2, .price, [class*='price']"
-            sels_miles = ".mileage, [class*='mileage']"
+        host = urlsplit(url).netloc
+        sels_price, sels_miles = next((v for k, v in VDP_SELECTORS.items() if k in host), DEFAULT_VDP_SELECTORS)
 
         try:
             ptxt = await page.locator(sels_price).first.text_content(timeout=TEXT_TIMEOUT)
@@ -311,10 +409,14 @@ async def enrich_vdp(context, row: Dict[str, Any]) -> Dict[str, Any]:
         if not title:
             try: title = (await page.locator("h1, h2").first.text_content(timeout=TEXT_TIMEOUT)).strip()
             except Exception: pass
+        # text fallbacks scan only <head> (title/meta/og tags), or the first 16 KB if there's no </head>
+        end = html.find("</head>")
+        head = html[:end] if end != -1 else html[:16384]
         if not year_v:
-            year_v = parse_year_from_text(title) or parse_year_from_text(html)
+            year_v = parse_year_from_text(title) or parse_year_from_text(head)
         if not price or not miles:
-            price = price or parse_price(html); miles = miles or parse_miles(html)
+            p_head, m_head = parse_price_miles(head)
+            price = price or p_head; miles = miles or m_head
 
         row.update({"price":price,"miles":miles,"title":title,"year":year_v})
         return row
@@ -322,73 +424,149 @@ async def enrich_vdp(context, row: Dict[str, Any]) -> Dict[str, Any]:
         await page.close()
 
 # -------------------- Orchestrator --------------------
+_MISSING = 10**9  # sorts rows without price/miles last
+
+def _sort_key(r: Dict[str, Any]):
+    price = r.get("price"); miles = r.get("miles")
+    return (_MISSING if price is None else price, _MISSING if miles is None else miles)
+
+async def _get_browser(p, headed: bool = False, profile_dir: Optional[str] = None):
+    """Return (browser, persistent_context, connected).
+
+    PW_WS / PLAYWRIGHT_WS_ENDPOINT -> attach to an already-running browser server (no cold start);
+    profile_dir -> launch_persistent_context so cookies/challenges survive between runs;
+    otherwise a fresh local launch.
+    """
+    ws = os.environ.get("PW_WS") or os.environ.get("PLAYWRIGHT_WS_ENDPOINT")
+    if ws:
+        log.info("[MAIN] Connecting to browser at %s", ws)
+        return await p.chromium.connect(ws), None, True
+    if profile_dir:
+        ctx = await p.chromium.launch_persistent_context(
+            profile_dir, headless=not headed, args=BROWSER_ARGS, **CONTEXT_OPTS)
+        return None, ctx, False
+    browser = await p.chromium.launch(headless=not headed, args=BROWSER_ARGS)
+    return browser, None, False
+
+async def _new_context(browser, debug: bool = False):
+    return await _setup_context(await browser.new_context(**CONTEXT_OPTS), debug)
+
+def _is_tracker(url: str) -> bool:
+    host = urlsplit(url).hostname or ""  # host only: a path/query mentioning e.g. doubleclick is fine
+    return any(h in host for h in BLOCKED_HOSTS)
+
+async def _setup_context(context, debug: bool = False):
+    context.set_default_timeout(SEL_TIMEOUT)
+    context.set_default_navigation_timeout(NAV_TIMEOUT)
+    await context.add_init_script("Object.defineProperty(navigator,'webdriver',{get:()=>undefined});")
+    # text-only scrape: drop images/fonts/css/media and ad/tracker requests before they hit the network
+    async def _block(route):
+        req = route.request
+        if req.resource_type in BLOCKED_RESOURCES or _is_tracker(req.url):
+            if log.isEnabledFor(logging.DEBUG): log.debug("[BLOCK] %s %s", req.resource_type, req.url)
+            await route.abort()
+        else:
+            await route.continue_()
+    await context.route("**/*", _block)
+    if debug:
+        context.on("request", lambda req: log.debug("[REQ] %s %s", req.method, req.url))
+        context.on("requestfailed", lambda req: log.debug("[REQ-FAIL] %s %s", req.url, req.failure))
+        context.on("response", lambda res: log.debug("[RES] %s %s", res.status, res.url))
+    return context
+
 async def query_listings_async(
     make: str, model: str, year: int, zip_code: str = DEFAULT_ZIP, radius_miles: int = DEFAULT_RADIUS,
     max_results_each: int = 8, headed: bool = False, enrich: bool = False,
-    site: str = "both", debug: bool = False, max_pages: int = 5, scroll_rounds: int = 12
+    site: str = "both", debug: bool = False, max_pages: int = 5, scroll_rounds: int = 12,
+    profile_dir: Optional[str] = None
 ) -> List[Dict[str, Any]]:
-    for host in ("www.autotrader.com","www.cars.com"):
-        if not _dns_ok(host): _print_progress(f"[WARN] DNS lookup failed for {host}.")
+    """Scrape listings; progress goes to the "scraper" logger.
+
+    If logging isn't configured (no handlers anywhere), progress is printed to stdout for the
+    duration of the call, like the CLI. debug=True lowers the logger to DEBUG for this call only.
+    """
+    prev_level, handler = log.level, None
+    if not log.hasHandlers():
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        if log.getEffectiveLevel() > logging.INFO: log.setLevel(logging.INFO)
+    if debug: log.setLevel(logging.DEBUG)
+    try:
+        return await _query_listings_async(make, model, year, zip_code, radius_miles, max_results_each,
+                                           headed, enrich, site, debug, max_pages, scroll_rounds, profile_dir)
+    finally:
+        log.setLevel(prev_level)
+        if handler: log.removeHandler(handler)
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=not headed,
-            args=["--disable-blink-features=AutomationControlled","--no-sandbox","--disable-dev-shm-usage"],
-        )
-        context = await browser.new_context(
-            user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                        "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"),
-            viewport={"width":1280,"height":900}, locale="en-US"
-        )
-        context.set_default_timeout(SEL_TIMEOUT)
-        context.set_default_navigation_timeout(NAV_TIMEOUT)
-        await context.add_init_script("Object.defineProperty(navigator,'webdriver',{get:()=>undefined});")
-        if debug:
-            context.on("request", lambda req: _print_progress(f"[REQ] {req.method} {req.url}"))
-            context.on("requestfailed", lambda req: _print_progress(f"[REQ-FAIL] {req.url} {req.failure}"))
-            context.on("response", lambda res: _print_progress(f"[RES] {res.status} {res.url}"))
+async def _query_listings_async(make, model, year, zip_code, radius_miles, max_results_each,
+                                headed, enrich, site, debug, max_pages, scroll_rounds, profile_dir):
+    hosts = ("www.autotrader.com","www.cars.com")
+    for host, ok in zip(hosts, await asyncio.gather(*[_dns_ok(h) for h in hosts])):
+        if not ok: log.warning("[WARN] DNS lookup failed for %s.", host)
 
+    async with async_playwright() as p:
+        browser, persistent, connected = await _get_browser(p, headed, profile_dir)
+        if persistent: await _setup_context(persistent, debug)
+        # one context per site: navigations/network run independently and cookies stay isolated
+        # (a persistent profile is a single context, so both sites share it)
+        contexts: Dict[str, Any] = {}
         tasks=[]
         if site in ("both","autotrader"):
-            page_at = await context.new_page()
+            contexts["autotrader"] = persistent or await _new_context(browser, debug)
+            page_at = await contexts["autotrader"].new_page()
             tasks.append(scrape_autotrader(page_at, make, model, year, zip_code, radius_miles,
                                            max_results_each, debug, scroll_rounds))
         if site in ("both","cars"):
-            page_cars = await context.new_page()
+            contexts["cars"] = persistent or await _new_context(browser, debug)
+            page_cars = await contexts["cars"].new_page()
             tasks.append(scrape_cars(page_cars, make, model, year, zip_code, radius_miles,
                                      max_results_each, debug, max_pages))
 
-        _print_progress("[MAIN] Starting site tasks...")
+        log.info("[MAIN] Starting site tasks...")
         out=[]
         try:
             results = await asyncio.gather(*tasks, return_exceptions=True)
             for r in results:
-                if isinstance(r, Exception): _print_progress(f"[MAIN] Task error: {r}")
+                if isinstance(r, Exception): log.info("[MAIN] Task error: %s", r)
                 else: out.extend(r or [])
+            out = _dedupe_and_trim(out, len(out))  # same listing surfaced via both sites/redirectors
         finally:
-            for pg in list(context.pages):
-                try: await pg.close()
-                except Exception: pass
+            for ctx in contexts.values():
+                for pg in list(ctx.pages):
+                    try: await pg.close()
+                    except Exception: pass
 
         if enrich:
-            _print_progress(f"[MAIN] Enriching {len(out)} rows via VDP...")
-            enriched=[]
-            for i, r in enumerate(out, 1):
-                if r.get("price") and r.get("miles") and r.get("title") and r.get("year"):
-                    enriched.append(r); continue
-                try: enriched.append(await enrich_vdp(context, r))
-                except Exception as e:
-                    _print_progress(f"[VDP] Enrich error: {e}"); enriched.append(r)
-                if i % 5 == 0: _print_progress(f"[MAIN] Enriched {i}/{len(out)}")
-                await asyncio.sleep(0.2)
-            out = _enrich_filter_year(enriched := enriched, year) if False else enriched  # keep line for clarity
+            log.info("[MAIN] Enriching %s rows via VDP...", len(out))
+            # per-site throttle: k VDP pages open at once on each site's context instead of one-by-one
+            sems = {k: asyncio.Semaphore(VDP_CONCURRENCY) for k in contexts}
+            done = [0]
+            async def _one(r):
+                key = "cars" if "cars.com" in (r.get("url") or "") else "autotrader"
+                if key not in contexts: key = next(iter(contexts))
+                async with sems[key]:
+                    try: return await enrich_vdp(contexts[key], r)
+                    finally:
+                        done[0] += 1
+                        if done[0] % 5 == 0: log.info("[MAIN] Enriched %s/%s", done[0], len(todo))
+            todo = [r for r in out if not (r.get("price") and r.get("miles") and r.get("title") and r.get("year"))]
+            vdp_tasks = [asyncio.ensure_future(_one(r)) for r in todo]  # strong refs until gathered
+            results = await asyncio.gather(*vdp_tasks, return_exceptions=True)
+            for res in results:
+                if isinstance(res, Exception): log.info("[VDP] Enrich error: %s", res)
+            # enrich_vdp updates rows in place, so `out` keeps its original order
             out = _enforce_year(out, year)
 
-        await context.close(); await browser.close()
+        # contexts are ours to close; a connected browser is shared and stays up for the next run
+        for ctx in contexts.values():
+            if ctx is not persistent: await ctx.close()
+        if persistent: await persistent.close()
+        elif not connected: await browser.close()
 
         out = [r for r in out if r.get("url")]
-        out.sort(key=lambda r: (10**9 if r.get("price") is None else r["price"], r.get("miles") or 10**9))
-        _print_progress(f"[MAIN] Done. {len(out)} rows total.")
+        out.sort(key=_sort_key)
+        log.info("[MAIN] Done. %s rows total.", len(out))
         return out
 
 # -------------------- Output --------------------
@@ -418,7 +596,9 @@ if __name__ == "__main__":
     ap.add_argument("--debug", action="store_true")
     ap.add_argument("--max-pages", type=int, default=5, help="Cars.com pages to fetch")
     ap.add_argument("--scroll-rounds", type=int, default=12, help="extra scroll rounds on Autotrader")
+    ap.add_argument("--persistent-profile", metavar="DIR", help="reuse a browser profile dir across runs")
     args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
 
     rows = asyncio.run(
         query_listings_async(
@@ -426,6 +606,7 @@ if __name__ == "__main__":
             zip_code=args.zip_code, radius_miles=args.radius,
             max_results_each=args.max, headed=args.headed, enrich=args.enrich,
             site=args.site, debug=args.debug, max_pages=args.max_pages, scroll_rounds=args.scroll_rounds,
+            profile_dir=args.persistent_profile,
         )
     )
     print_rows(rows)